@@ -16,3 +16,6 @@ GOOGLE_DRIVE_CREDENTIALS = {
 
 DRIVE_FOLDER_ID = "1nQQbhOKdqCw9jcGWSgjY82SAQkH2w6Hc"
 
+# Resumable Google Drive upload chunk size in bytes (multiple of 256KB);
+# lower it on memory-constrained hosts, raise it (8-16MB) on larger ones
+DRIVE_UPLOAD_CHUNKSIZE = 1024 * 1024
@@ -11,11 +11,16 @@ from src.routes.upload import upload_bp
 from src.routes.auth import auth_bp
 from src.routes.consistency import consistency_bp
 from src.services.notification_service import start_notification_service
+from src.services.json_provider import OrjsonProvider
+from src.migrate_indexes import merge_duplicate_consistency_records, create_indexes
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = 'knox-fit-secret-key-2024'
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# bcrypt cost factor; tune so hashing a password takes at least ~250ms on the deployed host
+app.config['BCRYPT_ROUNDS'] = int(os.environ.get('BCRYPT_ROUNDS', 12))
 
 # Enable CORS for all routes
 CORS(app)
@@ -34,6 +39,11 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 with app.app_context():
     db.create_all()
+    # db.create_all() skips existing tables, so add any indexes they are missing;
+    # both steps are no-ops once the database is up to date
+    with db.engine.begin() as conn:
+        merge_duplicate_consistency_records(conn)
+    create_indexes(db.engine)
     # Start notification service after database is initialized
     start_notification_service()
 
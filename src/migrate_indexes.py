@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+# Allow running as `python src/migrate_indexes.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import create_engine, select, update, delete, func
+from src.models.user import db, ConsistencyRecord
+
+DEFAULT_DATABASE_URI = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+
+def merge_duplicate_consistency_records(conn):
+    """Collapse duplicate (user_id, date) rows into the lowest id, OR-ing the logged flags"""
+    table = ConsistencyRecord.__table__
+    duplicates = conn.execute(
+        select(table.c.user_id, table.c.date)
+        .group_by(table.c.user_id, table.c.date)
+        .having(func.count() > 1)
+    ).all()
+
+    for user_id, record_date in duplicates:
+        rows = conn.execute(
+            select(table).where(table.c.user_id == user_id, table.c.date == record_date).order_by(table.c.id)
+        ).all()
+        keep, extra = rows[0], rows[1:]
+        cycle_starts = [row.cycle_start for row in rows if row.cycle_start]
+
+        conn.execute(update(table).where(table.c.id == keep.id).values(
+            workout_logged=any(row.workout_logged for row in rows),
+            diet_logged=any(row.diet_logged for row in rows),
+            streak_day=max(row.streak_day or 0 for row in rows),
+            cycle_start=min(cycle_starts) if cycle_starts else None
+        ))
+        conn.execute(delete(table).where(table.c.id.in_([row.id for row in extra])))
+
+    return len(duplicates)
+
+def create_indexes(engine):
+    """Create every model index missing from the database"""
+    indexes = [index for table in db.metadata.sorted_tables for index in table.indexes]
+
+    if engine.dialect.name == 'postgresql':
+        # Build without locking writes; CONCURRENTLY can't run inside a transaction
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for index in indexes:
+                columns = ', '.join(column.name for column in index.columns)
+                unique = 'UNIQUE ' if index.unique else ''
+                conn.exec_driver_sql(
+                    f'CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index.name} '
+                    f'ON "{index.table.name}" ({columns})'
+                )
+    else:
+        with engine.begin() as conn:
+            for index in indexes:
+                index.create(bind=conn, checkfirst=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Add the user/date indexes to an existing database')
+    parser.add_argument(
+        '--database-uri',
+        default=os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI),
+        help='SQLAlchemy database URI (defaults to DATABASE_URL or the app SQLite file)'
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_uri)
+
+    # The unique index can't be built while duplicate rows exist
+    with engine.begin() as conn:
+        merged = merge_duplicate_consistency_records(conn)
+    print(f"Merged {merged} duplicate consistency record group(s)")
+
+    create_indexes(engine)
+    print("Indexes created")
+
+if __name__ == '__main__':
+    main()
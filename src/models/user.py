@@ -1,27 +1,63 @@
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from datetime import datetime
+from src.services.cache import cache
+import bcrypt
+import hashlib
+import hmac
 
 db = SQLAlchemy()
 
+PASSWORD_CACHE_TTL = 300  # Seconds a successful password check is remembered
+BCRYPT_PREFIX = '$2'  # Hashes without this prefix are legacy werkzeug hashes
+MAX_PASSWORD_BYTES = 72  # bcrypt ignores everything after the first 72 bytes
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    username = db.Column(db.String(80), unique=True, index=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, index=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
     is_active = db.Column(db.Boolean, default=True)
     
-    # Relationship with uploads
-    uploads = db.relationship('Upload', backref='user', lazy=True)
-    consistency_records = db.relationship('ConsistencyRecord', backref='user', lazy=True)
+    # Relationship with uploads; collections must be loaded explicitly,
+    # e.g. with selectinload(User.uploads), to avoid hidden lazy loads
+    uploads = db.relationship('Upload', back_populates='user', lazy='raise')
+    consistency_records = db.relationship('ConsistencyRecord', back_populates='user', lazy='raise')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        rounds = current_app.config.get('BCRYPT_ROUNDS', 12)
+        self.password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Successful checks are cached so repeat logins skip the slow KDF;
+        # failures are never cached
+        if cache.get(self._password_cache_key(password)):
+            return True
+        
+        if self.password_hash.startswith(BCRYPT_PREFIX):
+            if not bcrypt.checkpw(password.encode(), self.password_hash.encode()):
+                return False
+        else:
+            if not check_password_hash(self.password_hash, password):
+                return False
+            # Upgrade legacy hash to bcrypt; saved by the caller's next commit.
+            # Longer passwords keep their legacy hash, since bcrypt would truncate them
+            if len(password.encode()) <= MAX_PASSWORD_BYTES:
+                self.set_password(password)
+        
+        cache.setex(self._password_cache_key(password), PASSWORD_CACHE_TTL, True)
+        return True
+
+    def _password_cache_key(self, password):
+        # HMAC of the password and current hash, so a password change invalidates it
+        return 'pwok:' + hmac.new(
+            current_app.config['SECRET_KEY'].encode(),
+            password.encode() + self.password_hash.encode(),
+            hashlib.sha256
+        ).hexdigest()
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -31,12 +67,16 @@ class User(db.Model):
             'id': self.id,
             'username': self.username,
             'email': self.email,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None,
+            'created_at': self.created_at,
+            'last_login': self.last_login,
             'is_active': self.is_active
         }
 
 class Upload(db.Model):
+    __table_args__ = (
+        db.Index('ix_upload_user_date', 'user_id', 'upload_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
@@ -47,6 +87,8 @@ class Upload(db.Model):
     ai_timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     google_drive_id = db.Column(db.String(255))
     
+    user = db.relationship('User', back_populates='uploads')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -54,12 +96,17 @@ class Upload(db.Model):
             'filename': self.filename,
             'original_filename': self.original_filename,
             'upload_type': self.upload_type,
-            'upload_date': self.upload_date.isoformat() if self.upload_date else None,
-            'ai_timestamp': self.ai_timestamp.isoformat() if self.ai_timestamp else None,
+            'upload_date': self.upload_date,
+            'ai_timestamp': self.ai_timestamp,
             'google_drive_id': self.google_drive_id
         }
 
 class ConsistencyRecord(db.Model):
+    # One record per user per day; the unique index also serves (user_id, date) range scans
+    __table_args__ = (
+        db.Index('uq_consistency_user_date', 'user_id', 'date', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -68,13 +115,15 @@ class ConsistencyRecord(db.Model):
     streak_day = db.Column(db.Integer, default=0)
     cycle_start = db.Column(db.Date)  # Start of 30-day cycle
     
+    user = db.relationship('User', back_populates='consistency_records')
+    
     def to_dict(self):
         return {
             'id': self.id,
             'user_id': self.user_id,
-            'date': self.date.isoformat() if self.date else None,
+            'date': self.date,
             'workout_logged': self.workout_logged,
             'diet_logged': self.diet_logged,
             'streak_day': self.streak_day,
-            'cycle_start': self.cycle_start.isoformat() if self.cycle_start else None
+            'cycle_start': self.cycle_start
         }
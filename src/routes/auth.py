@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify, current_app
-from src.models.user import db, User
+from src.models.user import db, User, MAX_PASSWORD_BYTES
 from datetime import datetime, timedelta
 import jwt
 import re
@@ -11,8 +11,9 @@ def validate_email(email):
     return re.match(pattern, email) is not None
 
 def validate_password(password):
-    # At least 8 characters, one uppercase, one lowercase, one digit
-    if len(password) < 8:
+    # At least 8 characters, one uppercase, one lowercase, one digit; at most
+    # MAX_PASSWORD_BYTES so bcrypt doesn't silently truncate it
+    if len(password) < 8 or len(password.encode()) > MAX_PASSWORD_BYTES:
         return False
     if not re.search(r'[A-Z]', password):
         return False
@@ -58,7 +59,7 @@ def register():
             return jsonify({'error': 'Invalid email format'}), 400
         
         if not validate_password(password):
-            return jsonify({'error': 'Password must be at least 8 characters with uppercase, lowercase, and digit'}), 400
+            return jsonify({'error': 'Password must be 8 to 72 characters with uppercase, lowercase, and digit'}), 400
         
         # Check if user already exists
         if User.query.filter_by(username=username).first():
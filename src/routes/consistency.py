@@ -1,29 +1,84 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from src.models.user import db, ConsistencyRecord, Upload, User
 from src.routes.auth import token_required
-from datetime import datetime, date, timedelta
+from src.services.cache import cache
+from src.services.streaks import count_streak, STREAK_LOOKBACK_DAYS
+from datetime import datetime, timedelta, time
+import functools
 import random
 
 consistency_bp = Blueprint('consistency', __name__)
 
+# Dialect inserts supporting ON CONFLICT DO NOTHING
+INSERT_BY_DIALECT = {
+    'sqlite': sqlite_insert,
+    'postgresql': pg_insert,
+}
+
+# Longest run of consecutive active days (gaps-and-islands): consecutive dates
+# minus their row number share the same group value
+BEST_STREAK_SQL = """
+    WITH active AS (
+        SELECT {day_number} - ROW_NUMBER() OVER (ORDER BY date) AS grp
+        FROM {table}
+        WHERE user_id = :uid AND (workout_logged OR diet_logged)
+    )
+    SELECT COALESCE(MAX(cnt), 0) FROM (
+        SELECT COUNT(*) AS cnt FROM active GROUP BY grp
+    ) AS runs
+"""
+DAY_NUMBER_SQL = {
+    'sqlite': 'CAST(julianday(date) AS INTEGER)',
+    'postgresql': "(date - DATE '1970-01-01')",
+}
+
+MISSED_MESSAGES = (
+    "Don't let yesterday's miss define today's success! 💪",
+    "Every champion has setbacks. What matters is the comeback! 🔥",
+    "Your journey continues today. Let's get back on track! 🚀",
+    "One missed day doesn't erase your progress. Keep going! ⚡",
+    "The best time to restart is now. You've got this! 🌟",
+    "Consistency isn't perfection. It's persistence! 💯",
+    "Your future self is counting on today's effort! 🎯",
+    "Small steps today, big results tomorrow! 📈",
+    "Turn today's motivation into tomorrow's habit! ✨",
+    "Progress over perfection, always! 🙌"
+)
+
+# Formatted with streak, items (joined with 'and') and items_list (comma separated)
+NOTIFICATION_TEMPLATES = (
+    "Don't break your {streak}-day streak! Log your {items} now! 💪",
+    "Your fitness journey needs you! Missing: {items_list}. There's still time! 🔥",
+    "Champions log their progress daily! Don't forget your {items}! 🏆",
+    "Consistency is key! You haven't logged your {items} today. 📈",
+    "Your future self will thank you! Log your {items} before bed! ✨"
+)
+
+STREAK_CACHE_TTL = 60  # Seconds
+STREAK_CACHE_KEY = 'streak:{user_id}'
+DASHBOARD_CACHE_TTL = 60  # Seconds; consistency data only changes on update
+DASHBOARD_CACHE_KEY = 'dashboard:{user_id}'
+WEEKLY_CACHE_TTL = 60  # Seconds
+WEEKLY_CACHE_KEY = 'weekly:{user_id}'
+
+# Missed-entry notifications are only sent after 8 PM
+CUTOFF_TIME = time(20, 0)
+
 def get_motivational_message(streak=0, missed_days=0):
     """Generate motivational messages based on user's progress"""
     
     if missed_days > 0:
-        missed_messages = [
-            "Don't let yesterday's miss define today's success! 💪",
-            "Every champion has setbacks. What matters is the comeback! 🔥",
-            "Your journey continues today. Let's get back on track! 🚀",
-            "One missed day doesn't erase your progress. Keep going! ⚡",
-            "The best time to restart is now. You've got this! 🌟",
-            "Consistency isn't perfection. It's persistence! 💯",
-            "Your future self is counting on today's effort! 🎯",
-            "Small steps today, big results tomorrow! 📈",
-            "Turn today's motivation into tomorrow's habit! ✨",
-            "Progress over perfection, always! 🙌"
-        ]
-        return random.choice(missed_messages)
+        return random.choice(MISSED_MESSAGES)
     
+    return get_streak_message(streak)
+
+@functools.lru_cache(maxsize=256)
+def get_streak_message(streak):
+    """Generate the motivational message for a streak length"""
     if streak == 0:
         return "Ready to start your fitness journey? Every expert was once a beginner! 🚀"
     elif streak == 1:
@@ -39,28 +94,40 @@ def get_motivational_message(streak=0, missed_days=0):
     else:
         return f"Legendary {streak}-day streak! You're an inspiration! 👑"
 
-def calculate_streak(user_id):
+def calculate_streak(user_id, today=None):
     """Calculate current streak for a user"""
-    today = date.today()
-    current_streak = 0
-    
-    # Start from yesterday and count backwards
-    check_date = today - timedelta(days=1)
-    
-    while True:
-        record = ConsistencyRecord.query.filter_by(
-            user_id=user_id,
-            date=check_date
-        ).first()
-        
-        if record and (record.workout_logged or record.diet_logged):
-            current_streak += 1
-            check_date -= timedelta(days=1)
-        else:
-            break
-    
+    if today is None:
+        today = datetime.utcnow().date()
+
+    # Cached together with the day it was calculated for, so it expires at midnight
+    cache_key = STREAK_CACHE_KEY.format(user_id=user_id)
+    cached = cache.get(cache_key)
+    if cached and cached[0] == today:
+        return cached[1]
+
+    # Fetch past records newest first in a single query
+    rows = db.session.query(
+        ConsistencyRecord.date,
+        ConsistencyRecord.workout_logged,
+        ConsistencyRecord.diet_logged
+    ).filter(
+        ConsistencyRecord.user_id == user_id,
+        ConsistencyRecord.date < today,
+        ConsistencyRecord.date >= today - timedelta(days=STREAK_LOOKBACK_DAYS)
+    ).order_by(ConsistencyRecord.date.desc()).all()
+
+    current_streak = count_streak(rows, today)
+    cache.setex(cache_key, STREAK_CACHE_TTL, (today, current_streak))
     return current_streak
 
+def calculate_best_streak(user_id):
+    """Calculate the longest streak a user has ever had"""
+    day_number = DAY_NUMBER_SQL[db.engine.dialect.name]
+    return db.session.execute(
+        text(BEST_STREAK_SQL.format(day_number=day_number, table=ConsistencyRecord.__tablename__)),
+        {'uid': user_id}
+    ).scalar()
+
 def get_or_create_consistency_record(user_id, target_date):
     """Get or create consistency record for a specific date"""
     record = ConsistencyRecord.query.filter_by(
@@ -69,34 +136,189 @@ def get_or_create_consistency_record(user_id, target_date):
     ).first()
     
     if not record:
-        # Check if we need to start a new 30-day cycle
-        latest_record = ConsistencyRecord.query.filter_by(
-            user_id=user_id
-        ).order_by(ConsistencyRecord.date.desc()).first()
-        
-        cycle_start = target_date
-        if latest_record and latest_record.cycle_start:
-            # Check if we're still within the 30-day cycle
-            days_since_cycle_start = (target_date - latest_record.cycle_start).days
-            if days_since_cycle_start < 30:
-                cycle_start = latest_record.cycle_start
-        
-        record = ConsistencyRecord(
+        # Continue the latest record's 30-day cycle if it is still running,
+        # resolved inside the INSERT so concurrent requests can't diverge
+        latest_cycle_start = db.select(ConsistencyRecord.cycle_start).where(
+            ConsistencyRecord.user_id == user_id
+        ).order_by(ConsistencyRecord.date.desc()).limit(1).scalar_subquery()
+        
+        cycle_start = db.case(
+            (latest_cycle_start > target_date - timedelta(days=30), latest_cycle_start),
+            else_=target_date
+        )
+        
+        insert = INSERT_BY_DIALECT[db.engine.dialect.name]
+        stmt = insert(ConsistencyRecord).values(
             user_id=user_id,
             date=target_date,
             cycle_start=cycle_start
-        )
-        db.session.add(record)
+        ).on_conflict_do_nothing(
+            index_elements=['user_id', 'date']
+        ).returning(ConsistencyRecord)
+        
+        try:
+            # Savepoint, so a failed upsert doesn't abort the caller's transaction
+            with db.session.begin_nested():
+                record = db.session.scalars(stmt).first()
+        except (OperationalError, ProgrammingError):
+            # ON CONFLICT needs the unique (user_id, date) index; without it, insert plainly
+            record = ConsistencyRecord(
+                user_id=user_id,
+                date=target_date,
+                cycle_start=db.session.scalar(db.select(cycle_start))
+            )
+            db.session.add(record)
+            db.session.flush()
+            return record
+        
+        if not record:
+            # Another request created the record first
+            record = ConsistencyRecord.query.filter_by(
+                user_id=user_id,
+                date=target_date
+            ).one()
     
     return record
 
+def get_record_rows(user_id, start_date, end_date):
+    """Fetch only the columns the summaries need for a date range, oldest first"""
+    # Plain row tuples skip ORM object construction for read-only summaries
+    return db.session.execute(
+        db.select(
+            ConsistencyRecord.date,
+            ConsistencyRecord.workout_logged,
+            ConsistencyRecord.diet_logged,
+            ConsistencyRecord.cycle_start
+        ).where(
+            ConsistencyRecord.user_id == user_id,
+            ConsistencyRecord.date >= start_date,
+            ConsistencyRecord.date <= end_date
+        ).order_by(ConsistencyRecord.date.asc())
+    ).all()
+
+def get_cycle_info(latest_record, end_date):
+    """Describe the 30-day cycle the latest record belongs to"""
+    cycle_start = None
+    cycle_day = 0
+    if latest_record and latest_record.cycle_start:
+        cycle_start = latest_record.cycle_start
+        cycle_day = (end_date - cycle_start).days + 1
+        if cycle_day > 30:
+            cycle_day = 30
+    
+    return {
+        'cycle_start': cycle_start,
+        'cycle_day': cycle_day,
+        'days_remaining': max(0, 30 - cycle_day) if cycle_day > 0 else 30
+    }
+
+def get_today_status(today_record):
+    """Describe what has been logged today"""
+    return {
+        'workout_logged': today_record.workout_logged if today_record else False,
+        'diet_logged': today_record.diet_logged if today_record else False,
+        'both_complete': (today_record.workout_logged and today_record.diet_logged) if today_record else False
+    }
+
+def summarize_records(records):
+    """Calculate logging statistics for a list of records"""
+    # Single pass over the records; only days with something logged count, so the
+    # empty placeholder rows created by reset-cycle don't dilute the percentages
+    total_days = 0
+    workout_days = 0
+    diet_days = 0
+    both_logged_days = 0
+    for r in records:
+        if r.workout_logged or r.diet_logged:
+            total_days += 1
+        if r.workout_logged:
+            workout_days += 1
+        if r.diet_logged:
+            diet_days += 1
+            if r.workout_logged:
+                both_logged_days += 1
+    
+    return {
+        'total_days': total_days,
+        'workout_days': workout_days,
+        'diet_days': diet_days,
+        'both_logged_days': both_logged_days,
+        'workout_percentage': round((workout_days / total_days * 100) if total_days > 0 else 0, 1),
+        'diet_percentage': round((diet_days / total_days * 100) if total_days > 0 else 0, 1),
+        'completion_percentage': round((both_logged_days / total_days * 100) if total_days > 0 else 0, 1)
+    }
+
+def summarize_week(records_by_date, start_date):
+    """Build the daily summary and stats for the 7 days from start_date"""
+    daily_summary = []
+    for i in range(7):
+        check_date = start_date + timedelta(days=i)
+        record = records_by_date.get(check_date)
+        
+        daily_summary.append({
+            'date': check_date,
+            'day_name': check_date.strftime('%A'),
+            'workout_logged': record.workout_logged if record else False,
+            'diet_logged': record.diet_logged if record else False,
+            'both_complete': (record.workout_logged and record.diet_logged) if record else False
+        })
+    
+    # Calculate weekly stats in a single pass (booleans count as 0/1)
+    workout_days = 0
+    diet_days = 0
+    complete_days = 0
+    for day in daily_summary:
+        workout_days += day['workout_logged']
+        diet_days += day['diet_logged']
+        complete_days += day['both_complete']
+    
+    weekly_stats = {
+        'workout_days': workout_days,
+        'diet_days': diet_days,
+        'complete_days': complete_days,
+        'workout_percentage': round((workout_days / 7 * 100), 1),
+        'diet_percentage': round((diet_days / 7 * 100), 1),
+        'completion_percentage': round((complete_days / 7 * 100), 1)
+    }
+    
+    return daily_summary, weekly_stats
+
+def bulk_ensure_records(user_id, dates, cycle_start):
+    """Create consistency records for any of the given dates that don't exist yet"""
+    if not dates:
+        return
+    
+    # One multi-row INSERT; dates that already have a record are skipped
+    insert = INSERT_BY_DIALECT[db.engine.dialect.name]
+    try:
+        with db.session.begin_nested():
+            db.session.execute(
+                insert(ConsistencyRecord).values([
+                    {'user_id': user_id, 'date': d, 'cycle_start': cycle_start}
+                    for d in dates
+                ]).on_conflict_do_nothing(index_elements=['user_id', 'date'])
+            )
+    except (OperationalError, ProgrammingError):
+        # Without the unique (user_id, date) index, insert only the dates that are missing
+        existing = set(db.session.scalars(
+            db.select(ConsistencyRecord.date).where(
+                ConsistencyRecord.user_id == user_id,
+                ConsistencyRecord.date.in_(dates)
+            )
+        ))
+        db.session.add_all([
+            ConsistencyRecord(user_id=user_id, date=d, cycle_start=cycle_start)
+            for d in dates if d not in existing
+        ])
+        db.session.flush()
+
 @consistency_bp.route('/data', methods=['GET'])
 @token_required
 def get_consistency_data(current_user):
     """Get consistency data for the current user"""
     try:
         # Get date range (default to last 30 days)
-        end_date = date.today()
+        end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=29)
         
         # Get consistency records
@@ -107,57 +329,27 @@ def get_consistency_data(current_user):
         ).order_by(ConsistencyRecord.date.asc()).all()
         
         # Calculate current streak
-        current_streak = calculate_streak(current_user.id)
-        
-        # Get current cycle info
-        latest_record = ConsistencyRecord.query.filter_by(
-            user_id=current_user.id
-        ).order_by(ConsistencyRecord.date.desc()).first()
-        
-        cycle_start = None
-        cycle_day = 0
-        if latest_record and latest_record.cycle_start:
-            cycle_start = latest_record.cycle_start
-            cycle_day = (end_date - cycle_start).days + 1
-            if cycle_day > 30:
-                cycle_day = 30
-        
-        # Calculate statistics
-        total_days = len(records)
-        workout_days = len([r for r in records if r.workout_logged])
-        diet_days = len([r for r in records if r.diet_logged])
-        both_logged_days = len([r for r in records if r.workout_logged and r.diet_logged])
+        current_streak = calculate_streak(current_user.id, end_date)
         
-        # Check if today's log is complete
-        today_record = ConsistencyRecord.query.filter_by(
-            user_id=current_user.id,
-            date=end_date
-        ).first()
+        # Get current cycle info, falling back to a query only when the window is empty
+        if records:
+            latest_record = records[-1]
+        else:
+            latest_record = ConsistencyRecord.query.filter_by(
+                user_id=current_user.id
+            ).order_by(ConsistencyRecord.date.desc()).first()
         
-        today_status = {
-            'workout_logged': today_record.workout_logged if today_record else False,
-            'diet_logged': today_record.diet_logged if today_record else False,
-            'both_complete': (today_record.workout_logged and today_record.diet_logged) if today_record else False
-        }
+        # Check if today's log is complete
+        today_record = records[-1] if records and records[-1].date == end_date else None
         
         return jsonify({
             'records': [record.to_dict() for record in records],
             'statistics': {
                 'current_streak': current_streak,
-                'total_days': total_days,
-                'workout_days': workout_days,
-                'diet_days': diet_days,
-                'both_logged_days': both_logged_days,
-                'workout_percentage': round((workout_days / total_days * 100) if total_days > 0 else 0, 1),
-                'diet_percentage': round((diet_days / total_days * 100) if total_days > 0 else 0, 1),
-                'completion_percentage': round((both_logged_days / total_days * 100) if total_days > 0 else 0, 1)
-            },
-            'cycle_info': {
-                'cycle_start': cycle_start.isoformat() if cycle_start else None,
-                'cycle_day': cycle_day,
-                'days_remaining': max(0, 30 - cycle_day) if cycle_day > 0 else 30
+                **summarize_records(records)
             },
-            'today_status': today_status,
+            'cycle_info': get_cycle_info(latest_record, end_date),
+            'today_status': get_today_status(today_record),
             'motivational_message': get_motivational_message(current_streak)
         }), 200
         
@@ -194,10 +386,16 @@ def update_consistency(current_user):
         else:
             record.diet_logged = True
         
-        # Calculate streak
+        # Calculate streak, dropping any cached value this update may have changed
+        cache.delete(STREAK_CACHE_KEY.format(user_id=current_user.id))
         record.streak_day = calculate_streak(current_user.id)
         
         db.session.commit()
+        cache.delete(
+            STREAK_CACHE_KEY.format(user_id=current_user.id),
+            DASHBOARD_CACHE_KEY.format(user_id=current_user.id),
+            WEEKLY_CACHE_KEY.format(user_id=current_user.id)
+        )
         
         # Check if both workout and diet are logged for today
         both_complete = record.workout_logged and record.diet_logged
@@ -211,6 +409,7 @@ def update_consistency(current_user):
         
     except Exception as e:
         db.session.rollback()
+        cache.delete(STREAK_CACHE_KEY.format(user_id=current_user.id))
         return jsonify({'error': f'Failed to update consistency: {str(e)}'}), 500
 
 @consistency_bp.route('/streak', methods=['GET'])
@@ -218,24 +417,13 @@ def update_consistency(current_user):
 def get_streak(current_user):
     """Get current streak information"""
     try:
-        current_streak = calculate_streak(current_user.id)
+        today = datetime.utcnow().date()
+        current_streak = calculate_streak(current_user.id, today)
         
         # Get best streak
-        best_streak = 0
-        records = ConsistencyRecord.query.filter_by(
-            user_id=current_user.id
-        ).order_by(ConsistencyRecord.date.asc()).all()
-        
-        temp_streak = 0
-        for i, record in enumerate(records):
-            if record.workout_logged or record.diet_logged:
-                temp_streak += 1
-                best_streak = max(best_streak, temp_streak)
-            else:
-                temp_streak = 0
+        best_streak = calculate_best_streak(current_user.id)
         
         # Check if user missed today
-        today = date.today()
         today_record = ConsistencyRecord.query.filter_by(
             user_id=current_user.id,
             date=today
@@ -258,17 +446,27 @@ def get_streak(current_user):
 def reset_cycle(current_user):
     """Reset the 30-day cycle"""
     try:
-        today = date.today()
+        today = datetime.utcnow().date()
         
-        # Create new cycle start record
-        record = get_or_create_consistency_record(current_user.id, today)
-        record.cycle_start = today
+        # Create the whole new cycle up front so later uploads only need a SELECT
+        cycle_dates = [today + timedelta(days=i) for i in range(30)]
+        bulk_ensure_records(current_user.id, cycle_dates, today)
+        
+        # Move days that already existed onto the new cycle
+        ConsistencyRecord.query.filter(
+            ConsistencyRecord.user_id == current_user.id,
+            ConsistencyRecord.date.in_(cycle_dates)
+        ).update({'cycle_start': today}, synchronize_session=False)
         
         db.session.commit()
+        cache.delete(
+            DASHBOARD_CACHE_KEY.format(user_id=current_user.id),
+            WEEKLY_CACHE_KEY.format(user_id=current_user.id)
+        )
         
         return jsonify({
             'message': 'New 30-day cycle started',
-            'cycle_start': today.isoformat(),
+            'cycle_start': today,
             'motivational_message': 'Fresh start! Let\'s make these 30 days count! 🚀'
         }), 200
         
@@ -281,13 +479,13 @@ def reset_cycle(current_user):
 def check_missed_entries(current_user):
     """Check for missed entries and return notification message"""
     try:
-        today = date.today()
-        current_time = datetime.now().time()
+        # Use UTC to match the timestamps stored by the models
+        now = datetime.utcnow()
+        today = now.date()
+        current_time = now.time()
         
         # Check if it's after 8 PM (20:00)
-        cutoff_time = datetime.strptime('20:00', '%H:%M').time()
-        
-        if current_time < cutoff_time:
+        if current_time < CUTOFF_TIME:
             return jsonify({
                 'should_notify': False,
                 'message': 'Still time to log your progress today!'
@@ -309,20 +507,18 @@ def check_missed_entries(current_user):
             if missed_diet:
                 missed_items.append('diet')
             
-            current_streak = calculate_streak(current_user.id)
+            current_streak = calculate_streak(current_user.id, today)
             
-            notification_messages = [
-                f"Don't break your {current_streak}-day streak! Log your {' and '.join(missed_items)} now! 💪",
-                f"Your fitness journey needs you! Missing: {', '.join(missed_items)}. There's still time! 🔥",
-                f"Champions log their progress daily! Don't forget your {' and '.join(missed_items)}! 🏆",
-                f"Consistency is key! You haven't logged your {' and '.join(missed_items)} today. 📈",
-                f"Your future self will thank you! Log your {' and '.join(missed_items)} before bed! ✨"
-            ]
+            message = random.choice(NOTIFICATION_TEMPLATES).format(
+                streak=current_streak,
+                items=' and '.join(missed_items),
+                items_list=', '.join(missed_items)
+            )
             
             return jsonify({
                 'should_notify': True,
                 'missed_items': missed_items,
-                'message': random.choice(notification_messages),
+                'message': message,
                 'current_streak': current_streak
             }), 200
         
@@ -339,46 +535,82 @@ def check_missed_entries(current_user):
 def get_weekly_summary(current_user):
     """Get weekly consistency summary"""
     try:
-        end_date = date.today()
+        cache_key = WEEKLY_CACHE_KEY.format(user_id=current_user.id)
+        weekly_summary = cache.get(cache_key)
+        if weekly_summary:
+            return jsonify(weekly_summary), 200
+        
+        end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=6)  # Last 7 days
         
-        records = ConsistencyRecord.query.filter(
-            ConsistencyRecord.user_id == current_user.id,
-            ConsistencyRecord.date >= start_date,
-            ConsistencyRecord.date <= end_date
-        ).order_by(ConsistencyRecord.date.asc()).all()
+        records = get_record_rows(current_user.id, start_date, end_date)
         
         # Create daily summary
-        daily_summary = []
-        for i in range(7):
-            check_date = start_date + timedelta(days=i)
-            record = next((r for r in records if r.date == check_date), None)
-            
-            daily_summary.append({
-                'date': check_date.isoformat(),
-                'day_name': check_date.strftime('%A'),
-                'workout_logged': record.workout_logged if record else False,
-                'diet_logged': record.diet_logged if record else False,
-                'both_complete': (record.workout_logged and record.diet_logged) if record else False
-            })
-        
-        # Calculate weekly stats
-        workout_days = len([d for d in daily_summary if d['workout_logged']])
-        diet_days = len([d for d in daily_summary if d['diet_logged']])
-        complete_days = len([d for d in daily_summary if d['both_complete']])
+        records_by_date = {r.date: r for r in records}
+        daily_summary, weekly_stats = summarize_week(records_by_date, start_date)
         
-        return jsonify({
+        weekly_summary = {
             'daily_summary': daily_summary,
-            'weekly_stats': {
-                'workout_days': workout_days,
-                'diet_days': diet_days,
-                'complete_days': complete_days,
-                'workout_percentage': round((workout_days / 7 * 100), 1),
-                'diet_percentage': round((diet_days / 7 * 100), 1),
-                'completion_percentage': round((complete_days / 7 * 100), 1)
-            }
-        }), 200
+            'weekly_stats': weekly_stats
+        }
+        cache.setex(cache_key, WEEKLY_CACHE_TTL, weekly_summary)
+        
+        return jsonify(weekly_summary), 200
         
     except Exception as e:
         return jsonify({'error': f'Failed to fetch weekly summary: {str(e)}'}), 500
 
+@consistency_bp.route('/dashboard', methods=['GET'])
+@token_required
+def get_dashboard(current_user):
+    """Get streak, today's status, weekly summary and 30-day stats in one response"""
+    try:
+        cache_key = DASHBOARD_CACHE_KEY.format(user_id=current_user.id)
+        dashboard = cache.get(cache_key)
+        if dashboard:
+            return jsonify(dashboard), 200
+        
+        end_date = datetime.utcnow().date()
+        start_date = end_date - timedelta(days=29)
+        week_start = end_date - timedelta(days=6)
+        
+        # Everything except the all-time best streak comes from one 30-day range query
+        records = get_record_rows(current_user.id, start_date, end_date)
+        records_by_date = {r.date: r for r in records}
+        
+        # A streak covering the whole window may extend further back
+        current_streak = count_streak(reversed(records), end_date)
+        if current_streak >= (end_date - start_date).days:
+            current_streak = calculate_streak(current_user.id, end_date)
+        
+        if records:
+            latest_record = records[-1]
+        else:
+            latest_record = db.session.execute(
+                db.select(ConsistencyRecord.cycle_start).where(
+                    ConsistencyRecord.user_id == current_user.id
+                ).order_by(ConsistencyRecord.date.desc()).limit(1)
+            ).first()
+        
+        today_record = records_by_date.get(end_date)
+        daily_summary, weekly_stats = summarize_week(records_by_date, week_start)
+        
+        dashboard = {
+            'current_streak': current_streak,
+            'best_streak': calculate_best_streak(current_user.id),
+            'missed_today': not (today_record and (today_record.workout_logged or today_record.diet_logged)),
+            'today_status': get_today_status(today_record),
+            'statistics': summarize_records(records),
+            'weekly_summary': {
+                'daily_summary': daily_summary,
+                'weekly_stats': weekly_stats
+            },
+            'cycle_info': get_cycle_info(latest_record, end_date),
+            'motivational_message': get_motivational_message(current_streak)
+        }
+        cache.setex(cache_key, DASHBOARD_CACHE_TTL, dashboard)
+        
+        return jsonify(dashboard), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch dashboard: {str(e)}'}), 500
@@ -1,20 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import load_only
 from src.models.user import db, Upload, User
 from src.routes.auth import token_required
+from src.services.cache import cache
 from src.services.google_drive import drive_service
-from datetime import datetime
+from datetime import datetime, time, timedelta
 import os
-import uuid
+import secrets
 
 upload_bp = Blueprint('upload', __name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
-
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+STATS_CACHE_TTL = 60  # Seconds; stats only change on upload or delete
+STATS_CACHE_KEY = 'stats:{user_id}'
 
 def generate_ai_timestamp():
     """AI-powered timestamp generation (simulated)"""
@@ -22,10 +23,6 @@ def generate_ai_timestamp():
     # lighting conditions, or other factors to determine optimal timestamp
     current_time = datetime.utcnow()
     
-    # Simulate AI analysis delay
-    import time
-    time.sleep(0.1)  # Simulate processing time
-    
     # For now, return current timestamp with AI confidence score
     return {
         'timestamp': current_time,
@@ -37,6 +34,10 @@ def generate_ai_timestamp():
 @token_required
 def upload_image(current_user):
     try:
+        # Reject oversized requests from the declared length, before request.files reads the body
+        if request.content_length and request.content_length > MAX_FILE_SIZE:
+            return jsonify({'error': 'File too large. Maximum size is 16MB'}), 413
+        
         # Check if file is present
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
@@ -47,32 +48,28 @@ def upload_image(current_user):
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        if not allowed_file(file.filename):
+        # Split the filename once and reuse the parts below
+        base_name, dot, file_extension = file.filename.rpartition('.')
+        file_extension = file_extension.lower()
+        
+        if not dot or file_extension not in ALLOWED_EXTENSIONS:
             return jsonify({'error': 'Invalid file type. Allowed: PNG, JPG, JPEG, GIF, WEBP'}), 400
         
         # Validate upload type
         if upload_type not in ['workout', 'diet']:
             return jsonify({'error': 'Invalid upload type. Must be "workout" or "diet"'}), 400
         
-        # Read file data
-        file_data = file.read()
-        
-        # Check file size
-        if len(file_data) > MAX_FILE_SIZE:
-            return jsonify({'error': 'File too large. Maximum size is 16MB'}), 400
-        
         # Generate unique filename
-        file_extension = file.filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename.rsplit('.', 1)[0])}.{file_extension}"
+        unique_filename = f"{secrets.token_hex(8)}_{secure_filename(base_name)}.{file_extension}"
         
         # Create user-specific directory
         user_upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], str(current_user.id))
         os.makedirs(user_upload_dir, exist_ok=True)
         
-        # Save file locally
+        # Stream file to disk without buffering it in memory
         file_path = os.path.join(user_upload_dir, unique_filename)
-        with open(file_path, 'wb') as f:
-            f.write(file_data)
+        file.save(file_path)
+        file_size = os.path.getsize(file_path)
         
         # Generate AI timestamp
         ai_result = generate_ai_timestamp()
@@ -89,7 +86,7 @@ def upload_image(current_user):
                     'ai_timestamp': ai_result['timestamp'].isoformat(),
                     'ai_confidence': ai_result['confidence'],
                     'ai_analysis': ai_result['analysis'],
-                    'file_size': len(file_data)
+                    'file_size': file_size
                 }
             )
         except Exception as e:
@@ -108,12 +105,13 @@ def upload_image(current_user):
         
         db.session.add(upload_record)
         db.session.commit()
+        cache.delete(STATS_CACHE_KEY.format(user_id=current_user.id))
         
         response_data = {
             'message': 'File uploaded successfully',
             'upload': upload_record.to_dict(),
             'ai_analysis': {
-                'timestamp': ai_result['timestamp'].isoformat(),
+                'timestamp': ai_result['timestamp'],
                 'confidence': ai_result['confidence'],
                 'analysis': ai_result['analysis']
             }
@@ -134,6 +132,9 @@ def upload_image(current_user):
         
         return jsonify(response_data), 201
         
+    except RequestEntityTooLarge:
+        # Bodies without a declared length still hit MAX_CONTENT_LENGTH while parsing
+        return jsonify({'error': 'File too large. Maximum size is 16MB'}), 413
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
@@ -203,6 +204,7 @@ def delete_upload(current_user, upload_id):
         # Delete from database
         db.session.delete(upload)
         db.session.commit()
+        cache.delete(STATS_CACHE_KEY.format(user_id=current_user.id))
         
         return jsonify({'message': 'Upload deleted successfully'}), 200
         
@@ -214,33 +216,38 @@ def delete_upload(current_user, upload_id):
 @token_required
 def get_upload_stats(current_user):
     try:
-        # Get upload statistics
-        total_uploads = Upload.query.filter_by(user_id=current_user.id).count()
-        workout_uploads = Upload.query.filter_by(user_id=current_user.id, upload_type='workout').count()
-        diet_uploads = Upload.query.filter_by(user_id=current_user.id, upload_type='diet').count()
-        
-        # Get recent uploads (last 7 days)
-        from datetime import timedelta
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_uploads = Upload.query.filter(
-            Upload.user_id == current_user.id,
-            Upload.upload_date >= week_ago
-        ).count()
-        
-        # Get today's uploads
-        today = datetime.utcnow().date()
-        today_uploads = Upload.query.filter(
-            Upload.user_id == current_user.id,
-            db.func.date(Upload.upload_date) == today
-        ).count()
-        
-        # Get Google Drive sync status
-        synced_uploads = Upload.query.filter(
-            Upload.user_id == current_user.id,
-            Upload.google_drive_id.isnot(None)
-        ).count()
+        cache_key = STATS_CACHE_KEY.format(user_id=current_user.id)
+        stats = cache.get(cache_key)
+        if stats:
+            return jsonify(stats), 200
+        
+        now = datetime.utcnow()
+        week_ago = now - timedelta(days=7)
+        # Compare the raw column against a range so the (user_id, upload_date) index is usable
+        today_start = datetime.combine(now.date(), time.min)
+        today_end = today_start + timedelta(days=1)
+        
+        # Get upload statistics with conditional counts in a single query
+        row = db.session.query(
+            db.func.count(Upload.id),
+            db.func.sum(db.case((Upload.upload_type == 'workout', 1), else_=0)),
+            db.func.sum(db.case((Upload.upload_type == 'diet', 1), else_=0)),
+            # Recent uploads (last 7 days)
+            db.func.sum(db.case((Upload.upload_date >= week_ago, 1), else_=0)),
+            # Today's uploads
+            db.func.sum(db.case(
+                ((Upload.upload_date >= today_start) & (Upload.upload_date < today_end), 1), else_=0
+            )),
+            # Google Drive sync status
+            db.func.sum(db.case((Upload.google_drive_id.isnot(None), 1), else_=0))
+        ).filter(Upload.user_id == current_user.id).one()
+        
+        # SUM() is NULL when the user has no uploads
+        total_uploads, workout_uploads, diet_uploads, recent_uploads, today_uploads, synced_uploads = (
+            value or 0 for value in row
+        )
         
-        return jsonify({
+        stats = {
             'total_uploads': total_uploads,
             'workout_uploads': workout_uploads,
             'diet_uploads': diet_uploads,
@@ -248,7 +255,10 @@ def get_upload_stats(current_user):
             'today_uploads': today_uploads,
             'google_drive_synced': synced_uploads,
             'sync_percentage': round((synced_uploads / total_uploads * 100) if total_uploads > 0 else 0, 1)
-        }), 200
+        }
+        cache.setex(cache_key, STATS_CACHE_TTL, stats)
+        
+        return jsonify(stats), 200
         
     except Exception as e:
         return jsonify({'error': f'Failed to fetch stats: {str(e)}'}), 500
@@ -258,17 +268,31 @@ def get_upload_stats(current_user):
 def sync_user_report(current_user):
     """Generate and sync user progress report to Google Drive"""
     try:
-        # Gather user data for report
-        uploads = Upload.query.filter_by(user_id=current_user.id).all()
+        # Gather summary aggregates for report in a single query
+        total_uploads, first_upload, last_upload, workout_uploads, diet_uploads = db.session.query(
+            db.func.count(Upload.id),
+            db.func.min(Upload.upload_date),
+            db.func.max(Upload.upload_date),
+            db.func.sum(db.case((Upload.upload_type == 'workout', 1), else_=0)),
+            db.func.sum(db.case((Upload.upload_type == 'diet', 1), else_=0))
+        ).filter(Upload.user_id == current_user.id).one()
+        
+        # Stream the upload list, loading only the columns to_dict() needs
+        uploads = Upload.query.filter_by(user_id=current_user.id).options(
+            load_only(
+                Upload.id, Upload.user_id, Upload.filename, Upload.original_filename,
+                Upload.upload_type, Upload.upload_date, Upload.ai_timestamp, Upload.google_drive_id
+            )
+        ).yield_per(500)
         
         report_data = {
             'user_info': current_user.to_dict(),
             'summary': {
-                'total_uploads': len(uploads),
-                'workout_uploads': len([u for u in uploads if u.upload_type == 'workout']),
-                'diet_uploads': len([u for u in uploads if u.upload_type == 'diet']),
-                'first_upload': min([u.upload_date for u in uploads]).isoformat() if uploads else None,
-                'last_upload': max([u.upload_date for u in uploads]).isoformat() if uploads else None
+                'total_uploads': total_uploads,
+                'workout_uploads': workout_uploads or 0,
+                'diet_uploads': diet_uploads or 0,
+                'first_upload': first_upload,
+                'last_upload': last_upload
             },
             'uploads': [upload.to_dict() for upload in uploads]
         }
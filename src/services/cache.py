@@ -0,0 +1,105 @@
+import logging
+import os
+import pickle
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe in-process key/value cache with per-key expiry.
+
+    Mirrors the small subset of the Redis API the app uses (get, setex,
+    delete) so it can be swapped for a shared Redis client later.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def setex(self, key, ttl, value):
+        """Store a value that expires after ttl seconds"""
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                self._evict()
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, *keys):
+        """Remove keys from the cache"""
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def _evict(self):
+        # Drop expired entries first, then the oldest inserted entry if still full
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
+
+
+class RedisCache:
+    """Shared cache backed by Redis, with the same get/setex/delete API as TTLCache.
+
+    Values are pickled so cached dates and tuples round-trip unchanged; the
+    Redis instance must only be reachable by this app. Redis errors are
+    logged and treated as cache misses so requests still fall back to the DB.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        """Return the cached value, or None if missing, expired or unreachable"""
+        try:
+            payload = self.client.get(key)
+        except Exception:
+            logger.exception("Error reading cache key %s", key)
+            return None
+        return pickle.loads(payload) if payload is not None else None
+
+    def setex(self, key, ttl, value):
+        """Store a value that expires after ttl seconds"""
+        try:
+            self.client.setex(key, ttl, pickle.dumps(value))
+        except Exception:
+            logger.exception("Error writing cache key %s", key)
+
+    def delete(self, *keys):
+        """Remove keys from the cache"""
+        if not keys:
+            return
+        try:
+            self.client.delete(*keys)
+        except Exception:
+            logger.exception("Error deleting cache keys %s", keys)
+
+def create_cache():
+    """Use Redis when REDIS_URL is set; otherwise fall back to a per-process cache"""
+    redis_url = os.environ.get('REDIS_URL')
+    if redis_url:
+        import redis
+        return RedisCache(redis.Redis.from_url(redis_url))
+
+    # Invalidation only reaches the worker that handled the write, so this is
+    # only consistent when the app runs as a single process
+    logger.warning("REDIS_URL not set - using a per-process cache; run a single worker or configure Redis")
+    return TTLCache()
+
+# Global cache instance
+cache = create_cache()
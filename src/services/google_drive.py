@@ -1,19 +1,37 @@
+import functools
+import gzip
 import os
 import json
-import io
-from datetime import datetime
+import logging
+import mimetypes
+import threading
+import time
+import google_auth_httplib2
+import httplib2
+import orjson
+from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build
+from googleapiclient.http import MediaFileUpload, MediaInMemoryUpload
+from src.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 # Google Drive configuration
 SCOPES = ['https://www.googleapis.com/auth/drive']
+UPLOAD_CHUNKSIZE = 1024 * 1024  # Default bytes per resumable upload request (multiple of 256KB)
+FOLDER_CACHE_TTL = 3600  # Seconds a user's Drive folder id is remembered
+HTTP_TIMEOUT = 60  # Seconds before a Drive API socket operation times out
+DRIVE_NUM_RETRIES = 5  # Retries with exponential backoff on 429 and 5xx responses
+REPORT_COMPRESSLEVEL = 6  # gzip level for uploaded reports; balances size and CPU
 
-# Load credentials from environment or config file
+# Load credentials from environment or config file; parsed once per process
+@functools.lru_cache(maxsize=1)
 def get_credentials():
     """Get Google Drive API credentials"""
     try:
         # Try to load from environment variable first
         creds_json = os.environ.get('GOOGLE_DRIVE_CREDENTIALS')
         if creds_json:
-            from google.oauth2.service_account import Credentials
             creds_info = json.loads(creds_json)
             return Credentials.from_service_account_info(creds_info, scopes=SCOPES)
         
@@ -25,7 +43,6 @@ def get_credentials():
             try:
                 import config
                 if hasattr(config, 'GOOGLE_DRIVE_CREDENTIALS'):
-                    from google.oauth2.service_account import Credentials
                     return Credentials.from_service_account_info(config.GOOGLE_DRIVE_CREDENTIALS, scopes=SCOPES)
             except ImportError:
                 pass
@@ -33,24 +50,57 @@ def get_credentials():
         # Return None if no credentials found
         return None
         
-    except Exception as e:
-        print(f"Error loading Google Drive credentials: {e}")
+    except Exception:
+        logger.exception("Error loading Google Drive credentials")
         return None
 
+def file_timestamp(now):
+    """Format a struct_time as YYYYMMDD_HHMMSS for Drive filenames"""
+    return f"{now.tm_year:04d}{now.tm_mon:02d}{now.tm_mday:02d}_{now.tm_hour:02d}{now.tm_min:02d}{now.tm_sec:02d}"
+
+def get_config_value(name, default=None):
+    """Read an optional setting from config.py"""
+    try:
+        import config
+        return getattr(config, name, default)
+    except ImportError:
+        return default
+
 class GoogleDriveService:
     def __init__(self):
         self.credentials = get_credentials()
         self.service = None
+        self.chunksize = get_config_value('DRIVE_UPLOAD_CHUNKSIZE', UPLOAD_CHUNKSIZE)
+        self.parent_folder_id = get_config_value('DRIVE_FOLDER_ID')
+        # user_email -> folder id, so repeat uploads skip the folder lookup
+        self._folder_cache = TTLCache(maxsize=10000)
+        # httplib2 connections aren't thread-safe, so each thread keeps its own
+        self._local = threading.local()
         
         if self.credentials:
             try:
-                from googleapiclient.discovery import build
-                self.service = build('drive', 'v3', credentials=self.credentials)
-                print("Google Drive service initialized successfully")
-            except Exception as e:
-                print(f"Error initializing Google Drive service: {e}")
+                # Use the discovery document bundled with the client instead of fetching it
+                self.service = build('drive', 'v3', http=self._http(), static_discovery=True)
+                logger.info("Google Drive service initialized successfully")
+            except Exception:
+                logger.exception("Error initializing Google Drive service")
         else:
-            print("Google Drive credentials not found - service will be disabled")
+            logger.warning("Google Drive credentials not found - service will be disabled")
+    
+    def _http(self):
+        """Return this thread's authorized HTTP client, reusing its open connection"""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials,
+                http=httplib2.Http(timeout=HTTP_TIMEOUT)
+            )
+            self._local.http = http
+        return http
+    
+    def _execute(self, request):
+        """Execute a Drive API request, retrying rate limits and server errors with backoff"""
+        return request.execute(http=self._http(), num_retries=DRIVE_NUM_RETRIES)
     
     def is_available(self):
         """Check if Google Drive service is available"""
@@ -61,24 +111,29 @@ class GoogleDriveService:
         if not self.is_available():
             return None
             
+        folder_id = self._folder_cache.get(user_email)
+        if folder_id:
+            return folder_id
+            
         try:
-            import config
-            parent_folder_id = getattr(config, 'DRIVE_FOLDER_ID', None)
+            parent_folder_id = self.parent_folder_id
             
             if not parent_folder_id:
-                print("DRIVE_FOLDER_ID not found in config.py. Creating user folder under root.")
+                logger.warning("DRIVE_FOLDER_ID not found in config.py. Creating user folder under root.")
                 # If no parent folder ID is specified, create directly under root
                 folder_name = f"KN0X-FIT_{user_email}"
                 query = f"name=\'{folder_name}\' and mimeType=\'application/vnd.google-apps.folder\' and \'root\' in parents"
             else:
-                print(f"Using DRIVE_FOLDER_ID: {parent_folder_id} as parent for user folders.")
+                logger.debug(f"Using DRIVE_FOLDER_ID: {parent_folder_id} as parent for user folders.")
                 folder_name = f"KN0X-FIT_{user_email}"
                 query = f"name=\'{folder_name}\' and mimeType=\'application/vnd.google-apps.folder\' and \'{parent_folder_id}\' in parents"
 
-            results = self.service.files().list(q=query, fields="files(id)").execute()
+            results = self._execute(self.service.files().list(q=query, fields="files(id)"))
             
             if results["files"]:
-                return results["files"][0]["id"]
+                folder_id = results["files"][0]["id"]
+                self._folder_cache.setex(user_email, FOLDER_CACHE_TTL, folder_id)
+                return folder_id
             
             # Create new folder
             folder_metadata = {
@@ -88,30 +143,29 @@ class GoogleDriveService:
             if parent_folder_id:
                 folder_metadata["parents"] = [parent_folder_id]
             
-            folder = self.service.files().create(body=folder_metadata, fields="id").execute()
+            folder = self._execute(self.service.files().create(body=folder_metadata, fields="id"))
+            self._folder_cache.setex(user_email, FOLDER_CACHE_TTL, folder["id"])
             return folder["id"]
             
-        except Exception as e:
-            print(f"Error creating user folder: {e}")
+        except Exception:
+            logger.exception("Error creating user folder")
             return None
     
     def upload_file(self, file_path, user_email, upload_type, original_filename, metadata=None):
         """Upload a file to Google Drive"""
         if not self.is_available():
-            print("Google Drive service not available for upload.")
+            logger.warning("Google Drive service not available for upload.")
             return None
             
         try:
-            from googleapiclient.http import MediaIoBaseUpload
-            
             # Get or create user folder
             folder_id = self.create_user_folder(user_email)
             if not folder_id:
-                print(f"Could not get or create folder for user {user_email}. Upload aborted.")
+                logger.error(f"Could not get or create folder for user {user_email}. Upload aborted.")
                 return None
             
             # Prepare file metadata
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = file_timestamp(time.localtime())
             drive_filename = f"{upload_type}_{timestamp}_{original_filename}"
             
             file_metadata = {
@@ -120,28 +174,39 @@ class GoogleDriveService:
                 'description': json.dumps(metadata) if metadata else None
             }
             
-            # Upload file
-            with open(file_path, 'rb') as file_data:
-                media = MediaIoBaseUpload(
-                    io.BytesIO(file_data.read()),
-                    mimetype='image/jpeg',
-                    resumable=True
-                )
-                
-                file = self.service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id,name,webViewLink'
-                ).execute()
-                
-                return {
-                    'id': file['id'],
-                    'name': file['name'],
-                    'web_view_link': file.get('webViewLink')
-                }
+            # Upload file, streamed from disk in chunks; files that fit in one
+            # chunk go up in a single request without a resumable session
+            mimetype = mimetypes.guess_type(original_filename)[0] or 'application/octet-stream'
+            media = MediaFileUpload(
+                file_path,
+                mimetype=mimetype,
+                resumable=os.path.getsize(file_path) > self.chunksize,
+                chunksize=self.chunksize
+            )
+            
+            request = self.service.files().create(
+                body=file_metadata,
+                media_body=media,
+                fields='id,name,webViewLink'
+            )
+            
+            if media.resumable():
+                file = None
+                while file is None:
+                    status, file = request.next_chunk(http=self._http(), num_retries=DRIVE_NUM_RETRIES)
+                    if status:
+                        logger.debug(f"Uploading {drive_filename}: {int(status.progress() * 100)}%")
+            else:
+                file = self._execute(request)
+            
+            return {
+                'id': file['id'],
+                'name': file['name'],
+                'web_view_link': file.get('webViewLink')
+            }
                 
-        except Exception as e:
-            print(f"Error uploading file to Google Drive: {e}")
+        except Exception:
+            logger.exception("Error uploading file to Google Drive")
             return None
     
     def delete_file(self, file_id):
@@ -150,10 +215,10 @@ class GoogleDriveService:
             return False
             
         try:
-            self.service.files().delete(fileId=file_id).execute()
+            self._execute(self.service.files().delete(fileId=file_id))
             return True
-        except Exception as e:
-            print(f"Error deleting file from Google Drive: {e}")
+        except Exception:
+            logger.exception("Error deleting file from Google Drive")
             return False
     
     def upload_user_report(self, user_email, report_data):
@@ -162,37 +227,40 @@ class GoogleDriveService:
             return None
             
         try:
-            from googleapiclient.http import MediaIoBaseUpload
-            
             # Get or create user folder
             folder_id = self.create_user_folder(user_email)
             if not folder_id:
                 return None
             
             # Prepare report
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            report_filename = f"progress_report_{timestamp}.json"
+            # Read the clock once for both the filename and the description
+            now = time.localtime()
+            timestamp = file_timestamp(now)
+            report_filename = f"progress_report_{timestamp}.json.gz"
             
             file_metadata = {
                 'name': report_filename,
                 'parents': [folder_id],
-                'description': f"Progress report for {user_email} generated on {datetime.now().isoformat()}"
+                'description': f"Progress report for {user_email} generated on {time.strftime('%Y-%m-%dT%H:%M:%S', now)}"
             }
             
-            # Convert report to JSON
-            report_json = json.dumps(report_data, indent=2, default=str)
+            # Convert report to compact, gzipped JSON bytes; orjson writes dates
+            # and datetimes as ISO 8601 itself, so no default callback is needed
+            report_json = orjson.dumps(report_data, option=orjson.OPT_NON_STR_KEYS)
+            payload = gzip.compress(report_json, compresslevel=REPORT_COMPRESSLEVEL)
             
-            media = MediaIoBaseUpload(
-                io.BytesIO(report_json.encode('utf-8')),
-                mimetype='application/json',
-                resumable=True
+            # Reports are small, so send them in one request without a resumable session
+            media = MediaInMemoryUpload(
+                payload,
+                mimetype='application/gzip',
+                resumable=False
             )
             
-            file = self.service.files().create(
+            file = self._execute(self.service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id,name,webViewLink'
-            ).execute()
+            ))
             
             return {
                 'id': file['id'],
@@ -200,8 +268,8 @@ class GoogleDriveService:
                 'web_view_link': file.get('webViewLink')
             }
             
-        except Exception as e:
-            print(f"Error uploading report to Google Drive: {e}")
+        except Exception:
+            logger.exception("Error uploading report to Google Drive")
             return None
 
 # Global service instance
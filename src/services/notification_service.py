@@ -1,8 +1,11 @@
 import schedule
-import time
 import threading
-from datetime import datetime, date, timedelta
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
 from src.models.user import db, User, ConsistencyRecord
+from src.services.streaks import count_streak, STREAK_LOOKBACK_DAYS
 import random
 import logging
 
@@ -10,21 +13,80 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+USER_BATCH_SIZE = 500  # Users fetched per round trip when streaming notification jobs
+NOTIFICATION_WORKERS = 16  # Threads dispatching notifications concurrently
+
+# Streak history for all active users, built once and reused with bound parameters
+ACTIVE_STREAK_ROWS = db.select(
+    ConsistencyRecord.user_id,
+    ConsistencyRecord.date,
+    ConsistencyRecord.workout_logged,
+    ConsistencyRecord.diet_logged
+).join(User, User.id == ConsistencyRecord.user_id).where(
+    User.is_active == True,
+    ConsistencyRecord.date < db.bindparam('today'),
+    ConsistencyRecord.date >= db.bindparam('since')
+).order_by(ConsistencyRecord.user_id, ConsistencyRecord.date.desc())
+
+# Message templates; only the chosen one is formatted
+REMINDER_TEMPLATES = (
+    "Hey {username}! Don't break your {streak}-day streak! 💪",
+    "{username}, your fitness journey needs you today! 🔥",
+    "Time to log your {items}, {username}! 📱",
+    "Champions like you don't skip days, {username}! 🏆",
+    "Your future self will thank you, {username}! ⚡",
+    "Consistency is your superpower, {username}! 🌟",
+    "Just a quick reminder, {username} - log your progress! 📈",
+    "You're doing amazing, {username}! Don't stop now! 💯"
+)
+
+WEEKLY_HIGH_TEMPLATES = (
+    "Outstanding week, {username}! {completion_rate}% completion rate! 🏆",
+    "You're on fire, {username}! {complete_days}/7 days completed! 🔥",
+    "Incredible consistency, {username}! Keep it up! 🌟"
+)
+
+WEEKLY_MID_TEMPLATES = (
+    "Great progress, {username}! {completion_rate}% this week! 💪",
+    "You're building strong habits, {username}! 📈",
+    "Solid week, {username}! Let's aim even higher! ⚡"
+)
+
+WEEKLY_LOW_TEMPLATES = (
+    "New week, fresh start, {username}! You've got this! 🚀",
+    "Every expert was once a beginner, {username}! 💯",
+    "This week is your comeback week, {username}! 🌟"
+)
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
 class NotificationService:
     def __init__(self):
         self.running = False
         self.thread = None
+        self.app = None
+        self._cv = threading.Condition()
         
     def start(self):
         """Start the notification service"""
         if not self.running:
             self.running = True
+            # Jobs run on the scheduler thread, so remember the app to push its context
+            if has_app_context():
+                self.app = current_app._get_current_object()
             
-            # Schedule daily check at 8 PM
-            schedule.every().day.at("20:00").do(self.send_daily_reminders)
+            # Schedule daily check at 8 PM UTC, the same cutoff the consistency routes use
+            schedule.every().day.at("20:00", "UTC").do(self._run_job, self.send_daily_reminders)
             
-            # Schedule weekly motivation on Sunday at 9 AM
-            schedule.every().sunday.at("09:00").do(self.send_weekly_motivation)
+            # Schedule weekly motivation on Sunday at 9 AM UTC
+            schedule.every().sunday.at("09:00", "UTC").do(self._run_job, self.send_weekly_motivation)
             
             # Start the scheduler thread
             self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
@@ -34,40 +96,55 @@ class NotificationService:
     
     def stop(self):
         """Stop the notification service"""
-        self.running = False
-        schedule.clear()
+        with self._cv:
+            self.running = False
+            schedule.clear()
+            self._cv.notify_all()
         logger.info("Notification service stopped")
     
     def _run_scheduler(self):
         """Run the scheduler in a separate thread"""
-        while self.running:
+        while True:
+            with self._cv:
+                if not self.running:
+                    break
+                # Sleep until the next job is due; stop() wakes us early
+                idle = schedule.idle_seconds()
+                self._cv.wait(timeout=max(idle, 0) if idle is not None else None)
+                if not self.running:
+                    break
             schedule.run_pending()
-            time.sleep(60)  # Check every minute
+    
+    def _run_job(self, job):
+        """Run a scheduled job inside the app context"""
+        if self.app is None:
+            return job()
+        with self.app.app_context():
+            return job()
     
     def send_daily_reminders(self):
         """Send daily reminder notifications to users who haven't logged"""
         try:
             logger.info("Checking for users who need daily reminders...")
             
-            today = date.today()
-            users = User.query.filter_by(is_active=True).all()
+            today = datetime.utcnow().date()
+            # Load each active user with today's record (if any) in one query
+            rows = db.session.query(User, ConsistencyRecord).outerjoin(
+                ConsistencyRecord,
+                db.and_(ConsistencyRecord.user_id == User.id, ConsistencyRecord.date == today)
+            ).filter(User.is_active == True).enable_eagerloads(False).yield_per(USER_BATCH_SIZE)
+            streaks = self._calculate_streaks(today)
             
-            for user in users:
-                try:
-                    # Check if user has logged today
-                    today_record = ConsistencyRecord.query.filter_by(
-                        user_id=user.id,
-                        date=today
-                    ).first()
+            with ThreadPoolExecutor(max_workers=NOTIFICATION_WORKERS) as executor:
+                for batch in batched(rows, USER_BATCH_SIZE):
+                    # All DB reads are done above, so workers only dispatch notifications
+                    list(executor.map(lambda row: self._check_user(*row, streaks), batch))
                     
-                    missed_workout = not (today_record and today_record.workout_logged)
-                    missed_diet = not (today_record and today_record.diet_logged)
-                    
-                    if missed_workout or missed_diet:
-                        self._send_reminder_notification(user, missed_workout, missed_diet)
-                        
-                except Exception as e:
-                    logger.error(f"Error checking user {user.id}: {e}")
+                    # Keep the identity map from growing while streaming users
+                    for user, today_record in batch:
+                        db.session.expunge(user)
+                        if today_record:
+                            db.session.expunge(today_record)
                     
         except Exception as e:
             logger.error(f"Error in send_daily_reminders: {e}")
@@ -77,18 +154,47 @@ class NotificationService:
         try:
             logger.info("Sending weekly motivation messages...")
             
-            users = User.query.filter_by(is_active=True).all()
+            end_date = datetime.utcnow().date()
+            start_date = end_date - timedelta(days=6)
+            users = User.query.filter_by(is_active=True).enable_eagerloads(False).yield_per(USER_BATCH_SIZE)
+            
+            # Count each user's complete days for the week in one grouped query
+            complete_days_by_user = dict(db.session.query(
+                ConsistencyRecord.user_id,
+                db.func.sum(db.case(
+                    (db.and_(ConsistencyRecord.workout_logged, ConsistencyRecord.diet_logged), 1),
+                    else_=0
+                ))
+            ).filter(
+                ConsistencyRecord.date.between(start_date, end_date)
+            ).group_by(ConsistencyRecord.user_id).all())
             
-            for user in users:
-                try:
-                    self._send_weekly_motivation_notification(user)
-                except Exception as e:
-                    logger.error(f"Error sending weekly motivation to user {user.id}: {e}")
+            with ThreadPoolExecutor(max_workers=NOTIFICATION_WORKERS) as executor:
+                for batch in batched(users, USER_BATCH_SIZE):
+                    list(executor.map(
+                        lambda user: self._send_weekly_motivation_notification(user, complete_days_by_user.get(user.id, 0)),
+                        batch
+                    ))
+                    
+                    for user in batch:
+                        db.session.expunge(user)
                     
         except Exception as e:
             logger.error(f"Error in send_weekly_motivation: {e}")
     
-    def _send_reminder_notification(self, user, missed_workout, missed_diet):
+    def _check_user(self, user, today_record, streaks):
+        """Send a reminder if the user hasn't logged everything today"""
+        try:
+            missed_workout = not (today_record and today_record.workout_logged)
+            missed_diet = not (today_record and today_record.diet_logged)
+            
+            if missed_workout or missed_diet:
+                self._send_reminder_notification(user, missed_workout, missed_diet, streaks.get(user.id, 0))
+                
+        except Exception as e:
+            logger.error(f"Error checking user {user.id}: {e}")
+    
+    def _send_reminder_notification(self, user, missed_workout, missed_diet, current_streak):
         """Send reminder notification to a specific user"""
         try:
             missed_items = []
@@ -97,22 +203,12 @@ class NotificationService:
             if missed_diet:
                 missed_items.append('diet')
             
-            # Calculate current streak
-            current_streak = self._calculate_streak(user.id)
-            
             # Generate personalized message
-            messages = [
-                f"Hey {user.username}! Don't break your {current_streak}-day streak! 💪",
-                f"{user.username}, your fitness journey needs you today! 🔥",
-                f"Time to log your {' and '.join(missed_items)}, {user.username}! 📱",
-                f"Champions like you don't skip days, {user.username}! 🏆",
-                f"Your future self will thank you, {user.username}! ⚡",
-                f"Consistency is your superpower, {user.username}! 🌟",
-                f"Just a quick reminder, {user.username} - log your progress! 📈",
-                f"You're doing amazing, {user.username}! Don't stop now! 💯"
-            ]
-            
-            message = random.choice(messages)
+            message = random.choice(REMINDER_TEMPLATES).format(
+                username=user.username,
+                streak=current_streak,
+                items=' and '.join(missed_items)
+            )
             
             # In a real implementation, this would send push notifications,
             # emails, or SMS. For now, we'll log it.
@@ -124,43 +220,25 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Error sending reminder to user {user.id}: {e}")
     
-    def _send_weekly_motivation_notification(self, user):
+    def _send_weekly_motivation_notification(self, user, complete_days):
         """Send weekly motivational message"""
         try:
             # Get weekly stats
-            end_date = date.today()
-            start_date = end_date - timedelta(days=6)
-            
-            records = ConsistencyRecord.query.filter(
-                ConsistencyRecord.user_id == user.id,
-                ConsistencyRecord.date >= start_date,
-                ConsistencyRecord.date <= end_date
-            ).all()
-            
-            complete_days = len([r for r in records if r.workout_logged and r.diet_logged])
             completion_rate = round((complete_days / 7 * 100), 1)
             
             # Generate motivational message based on performance
             if completion_rate >= 85:
-                messages = [
-                    f"Outstanding week, {user.username}! {completion_rate}% completion rate! 🏆",
-                    f"You're on fire, {user.username}! {complete_days}/7 days completed! 🔥",
-                    f"Incredible consistency, {user.username}! Keep it up! 🌟"
-                ]
+                templates = WEEKLY_HIGH_TEMPLATES
             elif completion_rate >= 60:
-                messages = [
-                    f"Great progress, {user.username}! {completion_rate}% this week! 💪",
-                    f"You're building strong habits, {user.username}! 📈",
-                    f"Solid week, {user.username}! Let's aim even higher! ⚡"
-                ]
+                templates = WEEKLY_MID_TEMPLATES
             else:
-                messages = [
-                    f"New week, fresh start, {user.username}! You've got this! 🚀",
-                    f"Every expert was once a beginner, {user.username}! 💯",
-                    f"This week is your comeback week, {user.username}! 🌟"
-                ]
+                templates = WEEKLY_LOW_TEMPLATES
             
-            message = random.choice(messages)
+            message = random.choice(templates).format(
+                username=user.username,
+                completion_rate=completion_rate,
+                complete_days=complete_days
+            )
             
             logger.info(f"WEEKLY MOTIVATION for {user.email}: {message}")
             self._store_notification(user.id, message, 'weekly_motivation')
@@ -168,27 +246,17 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Error sending weekly motivation to user {user.id}: {e}")
     
-    def _calculate_streak(self, user_id):
-        """Calculate current streak for a user"""
-        today = date.today()
-        current_streak = 0
-        
-        # Start from yesterday and count backwards
-        check_date = today - timedelta(days=1)
-        
-        while True:
-            record = ConsistencyRecord.query.filter_by(
-                user_id=user_id,
-                date=check_date
-            ).first()
-            
-            if record and (record.workout_logged or record.diet_logged):
-                current_streak += 1
-                check_date -= timedelta(days=1)
-            else:
-                break
+    def _calculate_streaks(self, today):
+        """Calculate current streaks for all active users in one query"""
+        rows = db.session.execute(ACTIVE_STREAK_ROWS, {
+            'today': today,
+            'since': today - timedelta(days=STREAK_LOOKBACK_DAYS)
+        })
         
-        return current_streak
+        return {
+            user_id: count_streak(user_rows, today)
+            for user_id, user_rows in itertools.groupby(rows, key=lambda row: row.user_id)
+        }
     
     def _store_notification(self, user_id, message, notification_type):
         """Store notification in database for later retrieval"""
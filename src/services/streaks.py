@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+STREAK_LOOKBACK_DAYS = 400  # Days of history scanned when calculating a current streak; caps its length
+
+def count_streak(rows, today):
+    """Count consecutive active days before today from rows ordered newest first"""
+    current_streak = 0
+    
+    # Start from yesterday and count backwards until the first gap
+    expected = today - timedelta(days=1)
+
+    for row in rows:
+        if row.date == today:
+            continue
+        if row.date != expected or not (row.workout_logged or row.diet_logged):
+            break
+        current_streak += 1
+        expected -= timedelta(days=1)
+
+    return current_streak